@@ -0,0 +1,136 @@
+import os
+import random
+import numpy as np
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Allow running without a display
+
+import reinforcement_snake
+from reinforcement_snake import SnakeGameAI, Direction, BLOCK_SIZE, EMPTY, BODY, HEAD, FOOD
+
+EPISODES = 200
+MAX_STEPS = 2000
+
+
+def on_display(game: SnakeGameAI, point) -> bool:
+    """
+    Check whether the whole block of a point lies inside the display, written independently of the game helpers under
+    test. Blocks partly outside the display count as a wall hit, as in `is_collision`
+    :param game: an instance of a SnakeGameAI
+    :param point: point in pixel coordinates
+    :return: If the block is inside the display
+    """
+    return 0 <= point.x and point.x + BLOCK_SIZE <= game.w and 0 <= point.y and point.y + BLOCK_SIZE <= game.h
+
+
+def expected_grid(game: SnakeGameAI) -> np.ndarray:
+    """
+    Rebuild the occupancy grid from scratch using the snake list and the food
+    :param game: an instance of a SnakeGameAI
+    :return: uint8 array that `game.grid` should be equal to
+    """
+    grid = np.full((game.h // BLOCK_SIZE, game.w // BLOCK_SIZE), EMPTY, dtype=np.uint8)
+    grid[game.food.y // BLOCK_SIZE, game.food.x // BLOCK_SIZE] = FOOD
+    for point in game.snake[1:]:
+        if on_display(game, point):
+            grid[int(point.y) // BLOCK_SIZE, int(point.x) // BLOCK_SIZE] = BODY
+    if on_display(game, game.head):
+        grid[int(game.head.y) // BLOCK_SIZE, int(game.head.x) // BLOCK_SIZE] = HEAD
+
+    return grid
+
+
+def expected_ray_distances(game: SnakeGameAI, grid: np.ndarray) -> np.ndarray:
+    """
+    Walk the 8 rays cell by cell over a rebuilt grid, clockwise starting from the current direction
+    :param game: an instance of a SnakeGameAI
+    :param grid: grid rebuilt with `expected_grid`
+    :return: float32 array that `game.get_ray_distances()` should be equal to
+    """
+    features = np.zeros((8, 3), dtype=np.float32)
+    if not on_display(game, game.head):
+        return features
+
+    clock_wise = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]  # (dx, dy) from right
+    start = {Direction.RIGHT: 0, Direction.DOWN: 2, Direction.LEFT: 4, Direction.UP: 6}[game.direction]
+    rows, cols = grid.shape
+    for i in range(8):
+        dx, dy = clock_wise[(start + i) % 8]
+        row = int(game.head.y) // BLOCK_SIZE + dy
+        col = int(game.head.x) // BLOCK_SIZE + dx
+        distance = 1
+        while 0 <= row < rows and 0 <= col < cols:
+            if grid[row, col] == BODY and features[i, 1] == 0:
+                features[i, 1] = 1 / distance
+            if grid[row, col] == FOOD and features[i, 2] == 0:
+                features[i, 2] = 1 / distance
+            row += dy
+            col += dx
+            distance += 1
+        features[i, 0] = 1 / distance  # First cell outside the display
+
+    return features
+
+
+def food_seeking_move(game: SnakeGameAI) -> list:
+    """
+    Choose the action whose next head position is closest to the food, so episodes also cover eating and growing
+    :param game: an instance of a SnakeGameAI
+    :return: action encoded as [straight, right turn, left turn]
+    """
+    clock_wise = [Direction.RIGHT, Direction.DOWN, Direction.LEFT, Direction.UP]
+    offsets = {Direction.RIGHT: (1, 0), Direction.DOWN: (0, 1), Direction.LEFT: (-1, 0), Direction.UP: (0, -1)}
+    idx = clock_wise.index(game.direction)
+    distances = []
+    for turn in (0, 1, -1):  # Straight, right turn, left turn
+        dx, dy = offsets[clock_wise[(idx + turn) % 4]]
+        distances.append(abs(game.head.x + dx * BLOCK_SIZE - game.food.x) +
+                         abs(game.head.y + dy * BLOCK_SIZE - game.food.y))
+    final_move = [0, 0, 0]
+    final_move[distances.index(min(distances))] = 1
+
+    return final_move
+
+
+def check_grid(w: int = 640, h: int = 480, episodes: int = EPISODES, seed: int = 0):
+    """
+    Play episodes mixing food seeking and random moves and compare the incrementally updated grid and the ray
+    distances against references rebuilt from scratch after every step
+    :param w: display width
+    :param h: display height
+    :param episodes: number of games to play
+    :param seed: seed for the random actions and food placement
+    :return: None
+    """
+    reinforcement_snake.SPEED = 0  # Do not limit the frame rate
+    random.seed(seed)
+    game = SnakeGameAI(w, h)
+    steps = 0
+    for episode in range(episodes):
+        game.reset()
+        grid = expected_grid(game)
+        assert np.array_equal(game.grid, grid), f'Grid out of sync after reset in episode {episode}'
+        assert np.allclose(game.get_ray_distances(), expected_ray_distances(game, grid)), \
+            f'Wrong ray distances after reset in episode {episode}'
+        for _ in range(MAX_STEPS):
+            if random.random() < 0.8:
+                final_move = food_seeking_move(game)
+            else:  # Random moves so the snake also hits walls and itself
+                final_move = [0, 0, 0]
+                final_move[random.randint(0, 2)] = 1
+            reward, done, score = game.play_step(final_move)
+            steps += 1
+            grid = expected_grid(game)
+            assert np.array_equal(game.grid, grid), \
+                f'Grid out of sync in episode {episode} at frame {game.frame_iteration} (reward {reward})'
+            assert np.allclose(game.get_ray_distances(), expected_ray_distances(game, grid)), \
+                f'Wrong ray distances in episode {episode} at frame {game.frame_iteration} (reward {reward})'
+            if done:
+                break
+
+    print('Grid and rays in sync for', episodes, 'episodes and', steps, 'steps')
+
+
+if __name__ == '__main__':
+    # Half of every size is a multiple of BLOCK_SIZE, otherwise the snake starts off the block grid used by the food
+    for width, height in [(640, 480), (200, 400), (280, 280), (680, 120)]:
+        check_grid(width, height)
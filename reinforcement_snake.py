@@ -1,7 +1,7 @@
 import pygame
 import random
 from enum import Enum
-from collections import namedtuple
+from collections import namedtuple, deque
 import numpy as np
 
 pygame.init()  # Initialize all modules correctly
@@ -16,6 +16,12 @@ BLUE2 = (0, 100, 255)
 BLACK = (0, 0, 0)
 BLOCK_SIZE = 20
 SPEED = 20
+# Occupancy grid cell codes
+EMPTY = 0
+BODY = 1
+HEAD = 2
+FOOD = 3
+WALL = 4  # Only used in the buffer cell after the grid, where rays leaving the display end
 
 """
 Changes to implement the ML algorithm:
@@ -34,6 +40,11 @@ class Direction(Enum):  # Set symbolic names bounded to unique values
     DOWN = 4
 
 
+# Ray directions as (dx, dy), clockwise starting from right: right, down-right, down, down-left, left, ...
+RAY_DIRECTIONS = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+RAY_START = {Direction.RIGHT: 0, Direction.DOWN: 2, Direction.LEFT: 4, Direction.UP: 6}
+
+
 class SnakeGameAI:  # Now it is an agent control game
 
     def __init__(self, w=640, h=480):
@@ -44,6 +55,29 @@ class SnakeGameAI:  # Now it is an agent control game
         self.display = pygame.display.set_mode((self.w, self.h))
         pygame.display.set_caption('Snake')
         self.clock = pygame.time.Clock()
+
+        # Occupancy grid (rows, cols) kept in sync with the snake and the food on every move. It is the front of a flat
+        # buffer followed by a wall cell, where rays leaving the display end, and a cell for a head outside the display
+        self.rows = self.h // BLOCK_SIZE
+        self.cols = self.w // BLOCK_SIZE
+        self._wall_cell = self.rows * self.cols
+        self._outside_cell = self._wall_cell + 1
+        self._buffer = np.zeros(self._outside_cell + 1, dtype=np.uint8)
+        self._buffer[self._wall_cell] = WALL
+        self._cell_codes = memoryview(self._buffer)  # Single cell reads and writes are cheaper than through numpy
+        self._grid = self._buffer[:self._wall_cell].reshape(self.rows, self.cols)
+        self._grid_view = np.lib.stride_tricks.as_strided(self._grid, writeable=False)
+
+        # Buffer index of every ray step from every cell: (cells, 8, steps), steps past the display hit the wall cell
+        steps = np.arange(1, max(self.rows, self.cols) + 1)
+        dx, dy = np.array(RAY_DIRECTIONS).T
+        row, col = np.divmod(np.arange(self._wall_cell), self.cols)
+        ray_rows = row[:, None, None] + dy[:, None] * steps
+        ray_cols = col[:, None, None] + dx[:, None] * steps
+        inside = (ray_rows >= 0) & (ray_rows < self.rows) & (ray_cols >= 0) & (ray_cols < self.cols)
+        self._ray_index = np.where(inside, ray_rows * self.cols + ray_cols, self._wall_cell)
+        self._ray_order = {direction: np.roll(np.arange(8), -start) for direction, start in RAY_START.items()}
+        self._ray_codes = np.array([WALL, BODY, FOOD], dtype=np.uint8)[:, None, None]
         self.reset()
 
     def reset(self):
@@ -58,6 +92,14 @@ class SnakeGameAI:  # Now it is an agent control game
                       InitialPoint(self.head.x - (2 * BLOCK_SIZE), self.head.y)]  # Initial snake body
         self.score = 0
         self.food = None
+        self._grid.fill(EMPTY)
+        # Buffer cells of the snake, in the same order as `self.snake`, so moves do not convert points to cells
+        self._head_row = int(self.head.y) // BLOCK_SIZE
+        self._head_col = int(self.head.x) // BLOCK_SIZE
+        self._cells = deque(self._cell(point) for point in self.snake)
+        for cell in self._cells:
+            self._cell_codes[cell] = BODY
+        self._cell_codes[self._cells[0]] = HEAD
         self._place_food()
         self.frame_iteration = 0
 
@@ -67,10 +109,59 @@ class SnakeGameAI:  # Now it is an agent control game
         """
         x = random.randint(0, (self.w - BLOCK_SIZE) // BLOCK_SIZE) * BLOCK_SIZE
         y = random.randint(0, (self.h - BLOCK_SIZE) // BLOCK_SIZE) * BLOCK_SIZE
-        self.food = Point(x, y)
         # Do not place food inside the snake
-        if self.food in self.snake:
+        cell = y // BLOCK_SIZE * self.cols + x // BLOCK_SIZE
+        if self._cell_codes[cell] != EMPTY:
             self._place_food()  # Place food in another coordinates
+            return
+        self.food = Point(x, y)
+        self._cell_codes[cell] = FOOD
+
+    def _in_bounds(self, pt) -> bool:
+        """
+        Check whether a point lies inside the display
+        :param pt: point in pixel coordinates
+        :return: If the point is inside the display
+        """
+        return 0 <= pt.x <= self.w - BLOCK_SIZE and 0 <= pt.y <= self.h - BLOCK_SIZE
+
+    def _cell(self, pt) -> int:
+        """
+        Buffer index of the grid cell holding a point
+        :param pt: point in pixel coordinates
+        :return: index of the cell, or of the outside cell for points outside the display
+        """
+        if not self._in_bounds(pt):
+            return self._outside_cell
+        return int(pt.y) // BLOCK_SIZE * self.cols + int(pt.x) // BLOCK_SIZE
+
+    @property
+    def grid(self) -> np.ndarray:
+        """
+        Read-only, C-contiguous view (no copy) of the occupancy grid with shape (rows, cols). Cells hold `EMPTY`,
+        `BODY`, `HEAD` or `FOOD` and are updated in place on every move, so the view always reflects the current game.
+        :return: uint8 array of the board
+        """
+        return self._grid_view
+
+    def get_ray_distances(self) -> np.ndarray:
+        """
+        Cast 8 rays from the head, clockwise starting from the current direction, and measure the distance to the
+        wall, the body and the food along each of them. Distances are inverted (1 / cells) so closer objects give
+        bigger values, 0 means the object is not seen along the ray.
+        :return: float32 array with shape (8, 3) holding [wall, body, food] for every ray
+        """
+        head_cell = self._cells[0]
+        if head_cell == self._outside_cell:
+            return np.zeros((8, 3), dtype=np.float32)
+
+        # Gather all 8 rays at once and find the first wall, body and food cell of each: hits is (3, 8, steps)
+        rays = self._buffer.take(self._ray_index[head_cell])
+        hits = rays == self._ray_codes
+        first = hits.argmax(axis=2)
+        seen = (first > 0) | hits[..., 0]  # argmax is also 0 when nothing is hit
+
+        return (seen / (first + 1)).T[self._ray_order[self.direction]].astype(np.float32)
 
     def _update_ui(self):
         """
@@ -115,12 +206,16 @@ class SnakeGameAI:  # Now it is an agent control game
 
         if self.direction == Direction.RIGHT:
             x += BLOCK_SIZE
+            self._head_col += 1
         elif self.direction == Direction.LEFT:
             x -= BLOCK_SIZE
+            self._head_col -= 1
         elif self.direction == Direction.DOWN:
             y += BLOCK_SIZE
+            self._head_row += 1
         elif self.direction == Direction.UP:
             y -= BLOCK_SIZE
+            self._head_row -= 1
 
         self.head = Point(x, y)
 
@@ -178,6 +273,7 @@ class SnakeGameAI:  # Now it is an agent control game
         self._collect_user_input()
 
         # Move
+        self._cell_codes[self._cells[0]] = BODY  # Previous head becomes part of the body
         self._move(action)
         self.snake.insert(0, self.head)  # Update the head at the beginning of the snake list
 
@@ -187,7 +283,11 @@ class SnakeGameAI:  # Now it is an agent control game
         if self.is_collision() or self.frame_iteration > 100 * len(self.snake):  # Collision or no improvement
             game_over = True
             reward = -10
+            self._cells.appendleft(self._cell(self.head))  # Only a game over can leave the display
+            self._cell_codes[self._cells[0]] = HEAD
             return reward, game_over, self.score
+        self._cells.appendleft(self._head_row * self.cols + self._head_col)
+        self._cell_codes[self._cells[0]] = HEAD
         # Place new food or just move
         if self.head == self.food:
             self.score += 1
@@ -195,6 +295,7 @@ class SnakeGameAI:  # Now it is an agent control game
             self._place_food()
         else:
             self.snake.pop()
+            self._cell_codes[self._cells.pop()] = EMPTY
 
         # Update UI and Clock
         self._update_ui()